@@ -9,14 +9,17 @@ import json
 import os
 import pathlib
 import sys
+from functools import partial
+from typing import Callable, Optional
 from alive_progress import alive_bar
 from argparser.main import args_parser
 from prettytable import PrettyTable
 from yandex_cloud_wrapper.yc_instance import YandexCloudInstance
+from yandex_cloud_wrapper.yc_journal import OperationJournal
 from yandex_cloud_wrapper.yc_rest_api_helper import YandexCloudRestApiHelper
 
 
-def main(namespace_args: argparse.Namespace) -> None:
+def main(namespace_args: argparse.Namespace, journal: Optional[OperationJournal] = None) -> None:  # pylint: disable=R0912, R0915
     """
     Main
     """
@@ -49,6 +52,16 @@ def main(namespace_args: argparse.Namespace) -> None:
         )
         yc_instances.append(yc_instance)
 
+    # Start journal run only after instances were found and checked, failed checks do not leave unfinished run
+    if namespace_args.action == "restore":
+        check_that_instance_has_snapshot_to_restore(yc_instances=yc_instances)
+    if journal is not None and not namespace_args.resume:
+        journal.start_run(
+            hosts=namespace_args.vm_name,
+            options={"use_image": namespace_args.use_image},
+            steps=plan_steps(action=namespace_args.action, use_image=namespace_args.use_image),
+        )
+
     # 3 - Create snapshots for all YC Instances
 
     if namespace_args.action == "create":
@@ -56,11 +69,13 @@ def main(namespace_args: argparse.Namespace) -> None:
             action="create_snapshot",
             bar_text="Creating snapshots...",
             yc_instances=yc_instances,
+            journal=journal,
         )
         run_action_with_alive_bar_on_hosts(
             action="wait_until_operation_is_done",
             bar_text="Wait until snapshots become READY...",
             yc_instances=yc_instances,
+            journal=journal,
         )
         print_common_info_table(yc_instances=yc_instances)
 
@@ -70,85 +85,239 @@ def main(namespace_args: argparse.Namespace) -> None:
         find_and_print_abandoned_snapshots(yc_instances=yc_instances)
 
     # 5 Delete snapshots
+    # Every step runs on all instances (it does nothing if there is nothing to delete), so journal plan is the same for every host
     if namespace_args.action == "delete":
-        instances_with_snapshots = list(filter(lambda j: (j.snapshot_id is not None), yc_instances))
-        if len(instances_with_snapshots) > 0:
+        run_action_with_alive_bar_on_hosts(
+            action="delete_snapshot",
+            bar_text="Deleting snapshots...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        run_action_with_alive_bar_on_hosts(
+            action="wait_until_operation_is_done",
+            bar_text="Wait until snapshots become Deleted...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        run_action_with_alive_bar_on_hosts(
+            action="delete_abandoned_snapshot",
+            bar_text="Deleting abandoned snapshots...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        run_action_with_alive_bar_on_hosts(
+            action="wait_until_operation_is_done",
+            bar_text="Wait until snapshots become Deleted...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        run_action_with_alive_bar_on_hosts(
+            action="delete_image",
+            bar_text="Deleting cached images...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        run_action_with_alive_bar_on_hosts(
+            action="wait_until_operation_is_done",
+            bar_text="Wait until images become Deleted...",
+            yc_instances=yc_instances,
+            journal=journal,
+        )
+        print_common_info_table(yc_instances=yc_instances)
+
+    # 6 Restore to snapshot
+    if namespace_args.action == "restore":
+        if namespace_args.use_image:
             run_action_with_alive_bar_on_hosts(
-                action="delete_snapshot",
-                bar_text="Deleting snapshots...",
-                yc_instances=instances_with_snapshots,
+                action="delete_stale_image",
+                bar_text="Deleting stale images...",
+                yc_instances=yc_instances,
+                journal=journal,
             )
             run_action_with_alive_bar_on_hosts(
                 action="wait_until_operation_is_done",
-                bar_text="Wait until snapshots become Deleted...",
-                yc_instances=instances_with_snapshots,
+                bar_text="Wait until stale images become Deleted...",
+                yc_instances=yc_instances,
+                journal=journal,
             )
-        instances_with_abandoned_snapshots = _find_instances_with_abandoned_snapshots(yc_instances=yc_instances)
-        if len(instances_with_abandoned_snapshots) > 0:
             run_action_with_alive_bar_on_hosts(
-                action="delete_abandoned_snapshot",
-                bar_text="Deleting abandoned snapshots...",
-                yc_instances=instances_with_abandoned_snapshots,
+                action="create_image",
+                bar_text="Creating images from snapshots...",
+                yc_instances=yc_instances,
+                journal=journal,
             )
             run_action_with_alive_bar_on_hosts(
-                action="wait_until_operation_is_done",
-                bar_text="Wait until snapshots become Deleted...",
-                yc_instances=instances_with_abandoned_snapshots,
+                action="wait_until_image_is_ready",
+                bar_text="Wait until images become READY...",
+                yc_instances=yc_instances,
+                journal=journal,
             )
-        print_common_info_table(yc_instances=yc_instances)
-
-    # 6 Restore to snapshot
-    if namespace_args.action == "restore":
-        check_that_instance_has_snapshot_to_restore(yc_instances=yc_instances)
         run_action_with_alive_bar_on_hosts(
             action="delete_instance",
             bar_text="Deleting current instances...",
             yc_instances=yc_instances,
+            journal=journal,
         )
         run_action_with_alive_bar_on_hosts(
             action="wait_until_operation_is_done",
             bar_text="Wait until instances become Deleted...",
             yc_instances=yc_instances,
+            journal=journal,
         )
-        run_action_with_alive_bar_on_hosts(
-            action="create_instance_from_snapshot",
-            bar_text="Creating instances from snapshots...",
-            yc_instances=yc_instances,
-        )
+        if namespace_args.use_image:
+            run_action_with_alive_bar_on_hosts(
+                action="create_instance_from_image",
+                bar_text="Creating instances from images...",
+                yc_instances=yc_instances,
+                journal=journal,
+            )
+        else:
+            run_action_with_alive_bar_on_hosts(
+                action="create_instance_from_snapshot",
+                bar_text="Creating instances from snapshots...",
+                yc_instances=yc_instances,
+                journal=journal,
+            )
         run_action_with_alive_bar_on_hosts(
             action="wait_until_operation_is_done",
             bar_text="Wait until instances become READY...",
             yc_instances=yc_instances,
+            journal=journal,
         )
         print_common_info_table(yc_instances=yc_instances)
 
+    if journal is not None:
+        journal.finish_run()
+
 
-def run_action_with_alive_bar_on_hosts(action: str, bar_text: str, yc_instances: list[YandexCloudInstance]):
+def run_action_with_alive_bar_on_hosts(
+    action: str,
+    bar_text: str,
+    yc_instances: list[YandexCloudInstance],
+    journal: Optional[OperationJournal] = None,
+):
     """
     Create alive bar
     For each instance run action with progress bar
+    If journal is passed, save submitted and completed steps to it
+    and skip steps already done by interrupted run
     """
+    wait_action = "wait_until" in action
     with alive_bar(len(yc_instances)) as progress_bar:
         progress_bar.text(bar_text)
         for yc_instance in yc_instances:
-            if "wait_until_operation_is_done" in action:
-                yc_instance.wait_until_operation_is_done()
-            elif "create_snapshot" in action:
-                yc_instance.create_snapshot()
-            elif "delete_snapshot" in action:
-                yc_instance.delete_snapshot()
-            elif "delete_abandoned_snapshot" in action:
-                yc_instance.delete_abandoned_snapshot()
-            elif "delete_instance" in action:
-                if yc_instance.instance_exist:
-                    yc_instance.delete_instance()
-            elif "create_instance_from_snapshot" in action:
-                yc_instance.create_instance_from_snapshot()
+            if journal is not None and not wait_action:
+                journal.set_current_step(host=yc_instance.name, step=action)
+            if wait_action:
+                wait_with_journal(action=action, yc_instance=yc_instance, journal=journal)
+            elif journal is not None and journal.is_completed(host=yc_instance.name, step=action):
+                yc_instance.operation_id = None
+            elif journal is not None and journal.is_submitted(host=yc_instance.name, step=action):
+                # Re-attach to operation submitted by interrupted run
+                yc_instance.operation_id = journal.get_operation_id(host=yc_instance.name, step=action)
+            elif (
+                journal is not None
+                and journal.is_submitting(host=yc_instance.name, step=action)
+                and action_was_submitted(action=action, yc_instance=yc_instance)
+            ):
+                # Interrupted run submitted operation, but did not save its id, so wait for created entity itself
+                yc_instance.operation_id = None
+                journal.record_submitted(host=yc_instance.name, step=action, operation_id=None)
+                wait_with_journal(action=action, yc_instance=yc_instance, journal=journal)
             else:
-                raise RuntimeError(f"Invalid action {action}")
+                yc_instance.operation_id = None
+                before_submit = None
+                if journal is not None:
+                    before_submit = partial(journal.record_submitting, host=yc_instance.name, step=action)
+                run_action_on_host(action=action, yc_instance=yc_instance, before_submit=before_submit)
+                if journal is not None:
+                    journal.record_submitted(host=yc_instance.name, step=action, operation_id=yc_instance.operation_id)
             progress_bar()  # pylint: disable=E1102
 
 
+def wait_with_journal(action: str, yc_instance: YandexCloudInstance, journal: Optional[OperationJournal] = None):
+    """
+    Wait until action is done on instance
+    If journal is passed, mark current step as completed, or as failed if waiting raised
+    """
+    try:
+        if "wait_until_image_is_ready" in action or "create_image" in action:
+            yc_instance.wait_until_image_is_ready()
+        elif "create_snapshot" in action:
+            yc_instance.wait_until_snapshot_is_ready()
+        elif "create_instance_from" in action:
+            yc_instance.wait_until_instance_is_running()
+        else:
+            yc_instance.wait_until_operation_is_done()
+    except Exception:
+        if journal is not None:
+            journal.record_failed(host=yc_instance.name)
+        raise
+    if journal is not None:
+        journal.record_completed(host=yc_instance.name)
+
+
+def run_action_on_host(action: str, yc_instance: YandexCloudInstance, before_submit: Optional[Callable[[], None]] = None):
+    """
+    Run action on instance
+    Create actions call before_submit after their checks passed, other actions call it before run
+    """
+    if "create_snapshot" in action:
+        yc_instance.create_snapshot(before_submit=before_submit)
+    elif "create_image" in action:
+        yc_instance.create_image(before_submit=before_submit)
+    elif "create_instance_from_snapshot" in action:
+        yc_instance.create_instance_from_snapshot(before_submit=before_submit)
+    elif "create_instance_from_image" in action:
+        yc_instance.create_instance_from_image(before_submit=before_submit)
+    else:
+        if "delete" not in action:
+            raise RuntimeError(f"Invalid action {action}")
+        if before_submit is not None:
+            before_submit()
+        if "delete_snapshot" in action:
+            yc_instance.delete_snapshot()
+        elif "delete_abandoned_snapshot" in action:
+            yc_instance.delete_abandoned_snapshot()
+        elif "delete_stale_image" in action:
+            yc_instance.delete_stale_image()
+        elif "delete_image" in action:
+            yc_instance.delete_image()
+        elif "delete_instance" in action:
+            if yc_instance.instance_exist:
+                yc_instance.delete_instance()
+
+
+def action_was_submitted(action: str, yc_instance: YandexCloudInstance) -> bool:
+    """
+    Check that entity created by action already exists
+    Used on resume for actions which could be submitted without saving operation id
+    Delete actions do nothing if entity does not exist, so they are run again
+    """
+    if "create_snapshot" in action:
+        return yc_instance.snapshot_id is not None
+    if "create_image" in action:
+        return yc_instance.image_id is not None
+    if "create_instance_from" in action:
+        return yc_instance.instance_exist
+    return False
+
+
+def plan_steps(action: str, use_image: bool) -> list[str]:
+    """
+    Return ordered list of steps, which action runs on each host
+    """
+    if action == "create":
+        return ["create_snapshot"]
+    if action == "delete":
+        return ["delete_snapshot", "delete_abandoned_snapshot", "delete_image"]
+    if action == "restore" and use_image:
+        return ["delete_stale_image", "create_image", "delete_instance", "create_instance_from_image"]
+    if action == "restore":
+        return ["delete_instance", "create_instance_from_snapshot"]
+    return []
+
+
 def _create_common_info_table() -> PrettyTable:
     """Create pretty table"""
     table = PrettyTable()
@@ -160,6 +329,7 @@ def _create_common_info_table() -> PrettyTable:
         "SnapshotId",
         "Snapshot created at",
         "Snapshot status",
+        "Cached imageId",
     ]
     return table
 
@@ -212,6 +382,7 @@ def print_common_info_table(yc_instances: list[YandexCloudInstance]):
                     instance.snapshot_id,
                     instance.snapshot_created_at,
                     instance.snapshot_status,
+                    instance.image_id,
                 ]
             )
             progress_bar()  # pylint: disable=E1102
@@ -278,6 +449,18 @@ if __name__ == "__main__":
         dest="vm_name",
         action="append",
     )
+    args_parser.add_argument(
+        "--use-image",
+        help="Restore from cached image, created from VM snapshot once. Speeds up repeated restores",
+        dest="use_image",
+        action="store_true",
+    )
+    args_parser.add_argument(
+        "--resume",
+        help="Resume interrupted run of action from journal: wait for submitted operations and run only remaining steps",
+        dest="resume",
+        action="store_true",
+    )
     args_parser.add_argument("action", choices=["create", "list", "delete", "restore"])
     namespace = args_parser.parse_args(sys.argv[1:])
     if namespace.action not in ["create", "list", "delete", "restore"]:
@@ -286,6 +469,18 @@ if __name__ == "__main__":
     folder_id: str = os.environ.get("YC_FOLDER_ID")
     if None in (yc_token, folder_id):
         raise ValueError("Please provide YC_TOKEN and FOLDER_ID environment variables!")
-    if len(namespace.vm_name) == 0:
+    operation_journal = None
+    if namespace.action != "list":
+        operation_journal = OperationJournal(action=namespace.action)
+    if namespace.resume:
+        if operation_journal is None or not operation_journal.has_unfinished_run:
+            raise ValueError(f"There is no interrupted {namespace.action} run to resume!")
+        if namespace.vm_name is not None and set(namespace.vm_name) != set(operation_journal.hosts):
+            raise ValueError(f"Interrupted {namespace.action} run was started for other VMs: {operation_journal.hosts}")
+        namespace.vm_name = operation_journal.hosts
+        namespace.use_image = operation_journal.options.get("use_image", False)
+        for host in operation_journal.hosts:
+            print(f"Resuming {namespace.action} for {host}, remaining planned steps: {operation_journal.remaining_steps(host=host)}")
+    if not namespace.vm_name:
         raise ValueError("Please provide Yandex Cloud VM Names!")
-    main(namespace_args=namespace)
+    main(namespace_args=namespace, journal=operation_journal)
@@ -2,7 +2,7 @@
 Yandex Cloud Instance object
 """
 
-from typing import Optional
+from typing import Callable, Optional
 
 from tenacity import retry, retry_if_result, stop_after_attempt, wait_fixed
 
@@ -29,9 +29,11 @@ class YandexCloudInstance:
         self.disk_id = disk_id
         self.instance_json = instance_json
         self.disk_info: dict[str] = instance_json.get("disk_info")
-        self.disk_source_snapshot_id: str = self.disk_info.get("sourceSnapshotId")
+        self.disk_source_snapshot_id: str = self.disk_info.get("sourceSnapshotId") or self.disk_info.get("sourceImageSnapshotId")
         self.snapshot_name: str = self.name + "-snapshot"
         self.snapshot_description: str = "Created by bundle_dev_tools"
+        self.image_name: str = self.name + "-image"
+        self.image_description: str = "Created by bundle_dev_tools"
         self.operation_id = None
 
     @property
@@ -83,6 +85,31 @@ class YandexCloudInstance:
             return snapshot
         return None
 
+    @property
+    def image_json(self) -> dict[str]:
+        """
+        Return cached image json (image with name of this VM, created from it's snapshot)
+        """
+        image = self.yc_wrapper.get_image_by_name(image_name=self.image_name)
+        if image is not None and image.get("description") == self.image_description:
+            return image
+        return {}
+
+    @property
+    def image_id(self) -> Optional[str]:
+        """
+        Return cached image id
+        """
+        return self.image_json.get("id")
+
+    def is_stale_image(self, image_json: dict[str], snapshot_id: Optional[str]) -> bool:
+        """
+        Cached image is stale if it was created from another snapshot (snapshot was replaced)
+        Image in ERROR status is stale too, it must be deleted and created again
+        """
+        image_source_snapshot_id = image_json.get("labels", {}).get(self.yc_wrapper.IMAGE_SOURCE_SNAPSHOT_LABEL)
+        return image_json.get("id") is not None and (image_source_snapshot_id != snapshot_id or image_json.get("status") == "ERROR")
+
     @retry(
         stop=stop_after_attempt(10),
         wait=wait_fixed(20),
@@ -96,15 +123,69 @@ class YandexCloudInstance:
             return self.yc_wrapper.get_operation_status(operation_id=self.operation_id)
         return True
 
+    @retry(
+        stop=stop_after_attempt(30),
+        wait=wait_fixed(20),
+        retry=retry_if_result(lambda result: result is False),
+    )
+    def wait_until_image_is_ready(self) -> bool:
+        """
+        Check that cached image is READY
+        Image could be created by interrupted run, so its operation id is unknown
+        Raise if image is missing or failed, instance must not be deleted without image to restore from
+        """
+        image_status = self.image_json.get("status")
+        if image_status == "CREATING":
+            return False
+        if image_status != "READY":
+            raise RuntimeError(f"Image {self.image_name} for instance {self.name} is not ready, status: {image_status}")
+        return True
+
+    @retry(
+        stop=stop_after_attempt(10),
+        wait=wait_fixed(20),
+        retry=retry_if_result(lambda result: result is False),
+    )
+    def wait_until_snapshot_is_ready(self) -> bool:
+        """
+        Check that snapshot is READY
+        Used when snapshot was created by interrupted run, so its operation id is unknown
+        """
+        snapshot_status = self.snapshot_status
+        if snapshot_status == "CREATING":
+            return False
+        if snapshot_status != "READY":
+            raise RuntimeError(f"Snapshot {self.snapshot_name} for instance {self.name} is not ready, status: {snapshot_status}")
+        return True
+
+    @retry(
+        stop=stop_after_attempt(10),
+        wait=wait_fixed(20),
+        retry=retry_if_result(lambda result: result is False),
+    )
+    def wait_until_instance_is_running(self) -> bool:
+        """
+        Check that instance is RUNNING
+        Used when instance was created by interrupted run, so its operation id is unknown
+        """
+        instance = self.yc_wrapper.get_instance_by_name(instance_name=self.name) or {}
+        instance_status = instance.get("status")
+        if instance_status in ("PROVISIONING", "STARTING"):
+            return False
+        if instance_status != "RUNNING":
+            raise RuntimeError(f"Instance {self.name} is not running, status: {instance_status}")
+        return True
+
     def get_snapshot(self) -> dict[str]:
         """
         Get snapshot if exist for this instance with it's disk_id
         """
         return self.yc_wrapper.find_snapshot_for_disk(disk_info=self.disk_info, snapshot_name=self.snapshot_name) or {}
 
-    def create_snapshot(self) -> None:
+    def create_snapshot(self, before_submit: Optional[Callable[[], None]] = None) -> None:
         """
         Create snapshot for boot disk
+        before_submit is called after all checks passed, right before request is sent
         """
         if not self.instance_exist:
             raise RuntimeError(f"Instance {self.name} does not exist! Cannot create snapshot!")
@@ -114,6 +195,8 @@ class YandexCloudInstance:
 
         if self.abandoned_snapshot is not None:
             raise RuntimeError(f"Can't create snapshot, abandoned snapshot for this VM already exist. Please delete snapshot {self.snapshot_name} first!")
+        if before_submit is not None:
+            before_submit()
         self.operation_id = self.yc_wrapper.create_snapshot_for_disk(
             source_disk_id=self.disk_id,
             snapshot_name=self.snapshot_name,
@@ -140,6 +223,48 @@ class YandexCloudInstance:
         """
         self.operation_id = self.yc_wrapper.delete_snapshot_for_disk(snapshot_id=snapshot_id)
 
+    def create_image(self, before_submit: Optional[Callable[[], None]] = None) -> None:
+        """
+        Create cached image from snapshot, if there is no valid image yet
+        before_submit is called after all checks passed, right before request is sent
+        """
+        snapshot_id = self.snapshot_id
+        if snapshot_id is None:
+            raise RuntimeError(f"Do not have valid snapshot for instance {self.name}, can't create image")
+        image_json = self.image_json
+        if self.is_stale_image(image_json=image_json, snapshot_id=snapshot_id):
+            raise RuntimeError(f"Image {self.image_name} is stale, please delete it first!")
+        if image_json.get("id") is None:
+            if before_submit is not None:
+                before_submit()
+            self.operation_id = self.yc_wrapper.create_image_from_snapshot(
+                snapshot_id=snapshot_id,
+                image_name=self.image_name,
+                image_description=self.image_description,
+            )
+
+    def delete_image(self) -> None:
+        """
+        Delete cached image
+        """
+        image_id = self.image_id
+        if image_id is not None:
+            self.__delete_image(image_id=image_id)
+
+    def delete_stale_image(self) -> None:
+        """
+        Delete cached image if it was created from another snapshot
+        """
+        image_json = self.image_json
+        if self.is_stale_image(image_json=image_json, snapshot_id=self.snapshot_id):
+            self.__delete_image(image_id=image_json["id"])
+
+    def __delete_image(self, image_id: str) -> None:
+        """
+        Delete image by id
+        """
+        self.operation_id = self.yc_wrapper.delete_image(image_id=image_id)
+
     def delete_instance(self) -> None:
         """
         Delete this instance
@@ -148,10 +273,29 @@ class YandexCloudInstance:
             raise RuntimeError("You don't have snapshot for this instance, are you sure want to delete it?")
         self.operation_id = self.yc_wrapper.delete_compute_instance(instance_id=self.instance_json.get("id"))
 
-    def create_instance_from_snapshot(self) -> None:
+    def create_instance_from_snapshot(self, before_submit: Optional[Callable[[], None]] = None) -> None:
         """
         Create new instance from snapshot
+        before_submit is called after all checks passed, right before request is sent
         """
-        if self.snapshot_id is None:
+        snapshot_id = self.snapshot_id
+        if snapshot_id is None:
+            raise RuntimeError("Do not have valid snapshot for this instance, can't restore to snapshot")
+        if before_submit is not None:
+            before_submit()
+        self.operation_id = self.yc_wrapper.create_compute_instance_from_snapshot(instance_json=self.instance_json, snapshot_id=snapshot_id)
+
+    def create_instance_from_image(self, before_submit: Optional[Callable[[], None]] = None) -> None:
+        """
+        Create new instance from cached image
+        before_submit is called after all checks passed, right before request is sent
+        """
+        snapshot_id = self.snapshot_id
+        if snapshot_id is None:
             raise RuntimeError("Do not have valid snapshot for this instance, can't restore to snapshot")
-        self.operation_id = self.yc_wrapper.create_compute_instance_from_snapshot(instance_json=self.instance_json, snapshot_id=self.snapshot_id)
+        image_json = self.image_json
+        if image_json.get("id") is None or self.is_stale_image(image_json=image_json, snapshot_id=snapshot_id) or image_json.get("status") != "READY":
+            raise RuntimeError(f"Do not have ready image {self.image_name} for this instance, can't restore from image")
+        if before_submit is not None:
+            before_submit()
+        self.operation_id = self.yc_wrapper.create_compute_instance_from_image(instance_json=self.instance_json, image_id=image_json["id"])
@@ -0,0 +1,195 @@
+"""
+Append-only journal of operations for multi-host runs
+"""
+
+import json
+import pathlib
+from typing import Any, Optional
+
+
+class OperationJournal:
+    """
+    Operation journal
+    Each line of journal file is json record:
+    run_started, planned, submitting, submitted, completed, failed, run_finished
+    Journal file holds only the current run, finished run is moved to <action>-journal.jsonl.1
+    """
+
+    def __init__(self, action: str):
+        self.action = action
+        json_data_folder = pathlib.Path(__file__).parent.resolve() / "json_data"
+        json_data_folder.mkdir(exist_ok=True, parents=True)
+        self.journal_file = json_data_folder / f"{action}-journal.jsonl"
+        self.finished_journal_file = json_data_folder / f"{action}-journal.jsonl.1"
+        self.run_record: Optional[dict[str, Any]] = None
+        self.run_finished = False
+        self.has_submitted_steps = False
+        self.planned_steps: dict[str, list[str]] = {}
+        self.step_states: dict[tuple[str, str], str] = {}
+        self.operation_ids: dict[tuple[str, str], Optional[str]] = {}
+        self.current_steps: dict[str, str] = {}
+        self.__load_last_run()
+
+    @property
+    def has_unfinished_run(self) -> bool:
+        """
+        Check that last run was started, submitted some steps, but was not finished
+        Run without submitted steps did not change anything, so there is nothing to resume
+        """
+        return self.run_record is not None and not self.run_finished and self.has_submitted_steps
+
+    @property
+    def hosts(self) -> list[str]:
+        """
+        Return hosts of the last run
+        """
+        return self.run_record["hosts"] if self.run_record is not None else []
+
+    @property
+    def options(self) -> dict[str, Any]:
+        """
+        Return options of the last run
+        """
+        return self.run_record["options"] if self.run_record is not None else {}
+
+    def start_run(self, hosts: list[str], options: dict[str, Any], steps: list[str]) -> None:
+        """
+        Start new run, save full ordered list of planned steps for each host
+        Unfinished run must be resumed first, it is the only record of hosts with remaining steps
+        """
+        if self.has_unfinished_run:
+            raise RuntimeError(
+                f"Interrupted {self.action} run for {self.hosts} is not finished! "
+                f"Please run it with --resume, or delete journal {self.journal_file} to discard it"
+            )
+        self.journal_file.unlink(missing_ok=True)
+        self.__append({"event": "run_started", "action": self.action, "hosts": hosts, "options": options})
+        for host in hosts:
+            for step in steps:
+                self.__append({"event": "planned", "host": host, "step": step})
+
+    def finish_run(self) -> None:
+        """
+        Mark run as finished, there is nothing to resume
+        Move finished run out of journal file, so journal does not grow between runs
+        """
+        self.__append({"event": "run_finished"})
+        self.journal_file.replace(self.finished_journal_file)
+
+    def record_submitting(self, host: str, step: str) -> None:
+        """
+        Save that operation of step is going to be submitted for host
+        """
+        self.__append({"event": "submitting", "host": host, "step": step})
+
+    def record_submitted(self, host: str, step: str, operation_id: Optional[str]) -> None:
+        """
+        Save submitted operation id of step for host
+        """
+        self.__append({"event": "submitted", "host": host, "step": step, "operation_id": operation_id})
+
+    def set_current_step(self, host: str, step: str) -> None:
+        """
+        Save step which is run on host now, next wait completes only this step
+        """
+        self.current_steps[host] = step
+
+    def record_completed(self, host: str) -> None:
+        """
+        Mark current submitted step of host as completed
+        """
+        step = self.current_steps.pop(host, None)
+        if step is not None and self.is_submitted(host=host, step=step):
+            self.__append({"event": "completed", "host": host, "step": step})
+
+    def record_failed(self, host: str) -> None:
+        """
+        Mark current submitted step of host as failed, it is run again on resume
+        """
+        step = self.current_steps.pop(host, None)
+        if step is not None and self.is_submitted(host=host, step=step):
+            self.__append({"event": "failed", "host": host, "step": step})
+
+    def is_submitting(self, host: str, step: str) -> bool:
+        """
+        Check that operation of step could be submitted for host, but its id was not saved
+        """
+        return self.step_states.get((host, step)) == "submitting"
+
+    def is_submitted(self, host: str, step: str) -> bool:
+        """
+        Check that operation of step was submitted for host, but is not completed yet
+        """
+        return self.step_states.get((host, step)) == "submitted"
+
+    def is_completed(self, host: str, step: str) -> bool:
+        """
+        Check that step was completed for host
+        """
+        return self.step_states.get((host, step)) == "completed"
+
+    def get_operation_id(self, host: str, step: str) -> Optional[str]:
+        """
+        Return submitted operation id of step for host
+        """
+        return self.operation_ids.get((host, step))
+
+    def remaining_steps(self, host: str) -> list[str]:
+        """
+        Return planned, but not completed steps of host
+        """
+        return [step for step in self.planned_steps.get(host, []) if not self.is_completed(host=host, step=step)]
+
+    def __apply(self, record: dict[str, Any]) -> None:
+        """
+        Update state of run with record
+        """
+        event = record["event"]
+        if event == "run_started":
+            self.run_record = record
+            self.run_finished = False
+            self.has_submitted_steps = False
+            self.planned_steps = {}
+            self.step_states = {}
+            self.operation_ids = {}
+        elif event == "run_finished":
+            self.run_finished = True
+        else:
+            host_step = (record["host"], record["step"])
+            if event == "planned":
+                self.planned_steps.setdefault(record["host"], []).append(record["step"])
+            if event in ("submitting", "submitted"):
+                self.has_submitted_steps = True
+            if event == "submitted":
+                self.operation_ids[host_step] = record["operation_id"]
+            self.step_states[host_step] = event
+
+    def __append(self, record: dict[str, Any]) -> None:
+        """
+        Append record to journal file
+        """
+        self.__apply(record=record)
+        with open(self.journal_file, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+
+    def __load_last_run(self) -> None:
+        """
+        Load state of the last run from journal file
+        """
+        if not self.journal_file.is_file():
+            return
+        with open(self.journal_file, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines(keepends=True)
+        if len(lines) > 0 and not lines[-1].endswith("\n"):
+            # Last line was written partially if run was interrupted, next record must start from new line
+            with open(self.journal_file, "a", encoding="utf-8") as file:
+                file.write("\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self.__apply(record=record)
@@ -18,7 +18,9 @@ class YandexCloudRestApiHelper:
     YANDEX_CLOUD_INSTANCES_ENDPOINT = f"{YANDEX_CLOUD_COMPUTE_API_URL}/compute/v1/instances"
     YANDEX_CLOUD_DISKS_ENDPOINT = f"{YANDEX_CLOUD_COMPUTE_API_URL}/compute/v1/disks"
     YANDEX_CLOUD_SNAPSHOTS_ENDPOINT = f"{YANDEX_CLOUD_COMPUTE_API_URL}/compute/v1/snapshots"
+    YANDEX_CLOUD_IMAGES_ENDPOINT = f"{YANDEX_CLOUD_COMPUTE_API_URL}/compute/v1/images"
     YANDEX_CLOUD_OPERATIONS_ENDPOINT = "https://operation.api.cloud.yandex.net/operations"
+    IMAGE_SOURCE_SNAPSHOT_LABEL = "source-snapshot-id"
 
     def __init__(self, token: str, folder_id: str):
         self.token = token
@@ -43,6 +45,7 @@ class YandexCloudRestApiHelper:
             instance = response["instances"][0]
             instance_disk_id = instance["bootDisk"]["diskId"]
             instance_disk = self.get_instance_disk(disk_id=instance_disk_id)
+            self.link_disk_with_image_snapshot(disk_info=instance_disk)
             instance.update({"disk_info": instance_disk})
             instance_ip_address = instance["networkInterfaces"][0]["primaryV4Address"]["address"]
             instance_subnet_id = instance["networkInterfaces"][0]["subnetId"]
@@ -77,6 +80,43 @@ class YandexCloudRestApiHelper:
         response: dict = self.__get_response(url=self.YANDEX_CLOUD_SNAPSHOTS_ENDPOINT, params=params)
         return response.get("snapshots")
 
+    def get_image_by_name(self, image_name: str) -> Optional[dict[str, Any]]:
+        """
+        Get image by name
+        """
+        params = {"folderId": self.folder_id, "filter": f'name="{image_name}"'}
+        response: dict = self.__get_response(url=self.YANDEX_CLOUD_IMAGES_ENDPOINT, params=params)
+        if response.get("images") is not None:
+            return response["images"][0]
+        return None
+
+    def get_image(self, image_id: str) -> Optional[dict[str, Any]]:
+        """
+        Get image by id
+        Return None if image does not exist
+        """
+        url = f"{self.YANDEX_CLOUD_IMAGES_ENDPOINT}/{image_id}"
+        try:
+            return self.__get_response(url=url, params={})
+        except requests.HTTPError as error:
+            if error.response is not None and error.response.status_code == 404:
+                return None
+            raise
+
+    def link_disk_with_image_snapshot(self, disk_info: dict[str]) -> None:
+        """
+        If disk was created from cached image, save image source snapshot id to disk info
+        """
+        source_image_id = disk_info.get("sourceImageId")
+        if source_image_id is None:
+            return
+        image = self.get_image(image_id=source_image_id)
+        if image is None:
+            return
+        source_snapshot_id = image.get("labels", {}).get(self.IMAGE_SOURCE_SNAPSHOT_LABEL)
+        if source_snapshot_id is not None:
+            disk_info.update({"sourceImageSnapshotId": source_snapshot_id})
+
     def find_snapshot_for_disk(self, disk_info: dict[str], snapshot_name: str = None) -> Optional[dict[str]]:
         """
         Find snapshot for disk
@@ -105,11 +145,41 @@ class YandexCloudRestApiHelper:
         create_snapshot_response = self.__post_response(url=self.YANDEX_CLOUD_SNAPSHOTS_ENDPOINT, json_body=body)
         return create_snapshot_response
 
+    def create_image_from_snapshot(self, snapshot_id: str, image_name: str, image_description: str) -> str:
+        """
+        Create pooled image from snapshot
+        Source snapshot id is saved to image labels in order to detect stale images
+        """
+        body = {
+            "folderId": self.folder_id,
+            "name": image_name,
+            "description": image_description,
+            "labels": {self.IMAGE_SOURCE_SNAPSHOT_LABEL: snapshot_id},
+            "snapshotId": snapshot_id,
+            "pooled": True,
+        }
+        create_image_response = self.__post_response(url=self.YANDEX_CLOUD_IMAGES_ENDPOINT, json_body=body)
+        return create_image_response
+
     def create_compute_instance_from_snapshot(self, instance_json: dict[str], snapshot_id: str) -> str:
         """
         Create compute instance with params from instance json.
         Use snapshotId to create boot disk
         """
+        return self.__create_compute_instance(instance_json=instance_json, disk_source={"snapshotId": snapshot_id})
+
+    def create_compute_instance_from_image(self, instance_json: dict[str], image_id: str) -> str:
+        """
+        Create compute instance with params from instance json.
+        Use imageId to create boot disk
+        """
+        return self.__create_compute_instance(instance_json=instance_json, disk_source={"imageId": image_id})
+
+    def __create_compute_instance(self, instance_json: dict[str], disk_source: dict[str]) -> str:
+        """
+        Create compute instance with params from instance json.
+        Boot disk is created from disk_source (snapshotId or imageId)
+        """
         body = {
             "folderId": self.folder_id,
             "name": instance_json["name"],
@@ -132,7 +202,7 @@ class YandexCloudRestApiHelper:
                     "typeId": instance_json["disk_info"]["typeId"],
                     "size": instance_json["disk_info"]["size"],
                     "blockSize": instance_json["disk_info"]["blockSize"],
-                    "snapshotId": snapshot_id,
+                    **disk_source,
                 },
             },
             "networkInterfaceSpecs": [
@@ -155,6 +225,12 @@ class YandexCloudRestApiHelper:
         """
         return self.__delete_entity(entity_id=snapshot_id, url=self.YANDEX_CLOUD_SNAPSHOTS_ENDPOINT)
 
+    def delete_image(self, image_id: str) -> str:
+        """
+        Delete image by id
+        """
+        return self.__delete_entity(entity_id=image_id, url=self.YANDEX_CLOUD_IMAGES_ENDPOINT)
+
     def delete_compute_instance(self, instance_id: str) -> str:
         """
         Delete compute instance by id
@@ -207,17 +283,25 @@ class YandexCloudRestApiHelper:
     def get_operation_status(self, operation_id: str) -> bool:
         """
         Wait until REST API operation ends with success
+        Raise if operation ends with error
         """
         url = f"{self.YANDEX_CLOUD_OPERATIONS_ENDPOINT}/{operation_id}"
         operation_result = self.__get_response(url=url, params={})
         done = operation_result["done"]
+        if done and operation_result.get("error") is not None:
+            raise RuntimeError(f"Operation {operation_id} failed: {operation_result['error'].get('message')}")
         return done
 
     def compare_snapshot_and_disk(self, snapshot: dict[str], disk_info: dict[str]) -> bool:
         """
         Compare snapshot and disk by sourceDiskId and sourceSnapshotId
+        Disks created from cached image are linked with snapshot by sourceImageSnapshotId
         """
-        return snapshot["sourceDiskId"] == disk_info["id"] or disk_info.get("sourceSnapshotId") == snapshot["id"]
+        return (
+            snapshot["sourceDiskId"] == disk_info["id"]
+            or disk_info.get("sourceSnapshotId") == snapshot["id"]
+            or disk_info.get("sourceImageSnapshotId") == snapshot["id"]
+        )
 
 
 def save_json(data: dict[str, Any]) -> None: